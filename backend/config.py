@@ -14,6 +14,14 @@ class Config:
         f'sqlite:///{os.path.join(DB_DIR, "stock_analyzer.db")}?timeout=30'
     )
     
+    # On-disk cache of per-stock weekly indicators for Weinstein screening (empty disables it)
+    WEINSTEIN_CACHE_DIR = os.environ.get('WEINSTEIN_CACHE_DIR', os.path.join(DB_DIR, 'weinstein_cache'))
+    
+    # Upper bound on worker processes forked for Weinstein screening; each one is a forked
+    # copy of the backend process, so keep it low under container memory limits
+    # (1 or a platform without fork runs screening inline)
+    WEINSTEIN_MAX_WORKERS = int(os.environ.get('WEINSTEIN_MAX_WORKERS', 2))
+    
     # Disable SQLAlchemy modification tracking (saves resources)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
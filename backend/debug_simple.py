@@ -42,7 +42,6 @@ def simple_debug():
         
         logger.info(f"Index data: {len(index_daily)} records")
         
-        index_daily['timestamp'] = pd.to_datetime(index_daily['timestamp'])
         index_weekly = resample_index_to_weekly(index_daily)
         logger.info(f"Index weekly: {len(index_weekly)} weeks")
         
@@ -63,12 +62,13 @@ def simple_debug():
         } for r in records])
         
         daily_df = daily_df[daily_df['close'] > 0]
-        daily_df['timestamp'] = pd.to_datetime(daily_df['timestamp'])
+        if not pd.api.types.is_datetime64_any_dtype(daily_df['timestamp']):
+            daily_df['timestamp'] = pd.to_datetime(daily_df['timestamp'])
         
         weekly_df = resample_to_weekly(daily_df)
         logger.info(f"Weekly records: {len(weekly_df)}")
         
-        weekly_df = compute_indicators(weekly_df, index_weekly)
+        weekly_df = compute_indicators(weekly_df, index_weekly.set_index('timestamp')['close'])
         logger.info(f"After indicators: {len(weekly_df)} weeks")
         
         # Check latest week before filters
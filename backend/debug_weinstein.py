@@ -41,7 +41,6 @@ def debug_weinstein_screening():
             logger.error("No index data available")
             return
         
-        index_daily['timestamp'] = pd.to_datetime(index_daily['timestamp'])
         index_weekly = resample_index_to_weekly(index_daily)
         logger.info(f"Index weekly data: {len(index_weekly)} weeks")
         
@@ -95,7 +94,8 @@ def debug_weinstein_screening():
                     continue
                 
                 # Convert to weekly
-                daily_df['timestamp'] = pd.to_datetime(daily_df['timestamp'])
+                if not pd.api.types.is_datetime64_any_dtype(daily_df['timestamp']):
+                    daily_df['timestamp'] = pd.to_datetime(daily_df['timestamp'])
                 weekly_df = resample_to_weekly(daily_df)
                 logger.info(f"  Weekly records: {len(weekly_df)}")
                 
@@ -105,7 +105,7 @@ def debug_weinstein_screening():
                     continue
                 
                 # Compute indicators
-                weekly_df = compute_indicators(weekly_df, index_weekly)
+                weekly_df = compute_indicators(weekly_df, index_weekly.set_index('timestamp')['close'])
                 
                 # Apply filters (no liquidity threshold for Nifty 500)
                 weekly_df = apply_filters(weekly_df)
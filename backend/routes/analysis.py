@@ -257,7 +257,9 @@ def get_chart_data(symbol):
         
         del ohlcv_records
         
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Datetime objects from the ORM are already inferred as datetime64
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
         df.set_index('timestamp', inplace=True)
         
         df_daily = df.resample('1D').agg({
@@ -5,7 +5,10 @@ Provides endpoints for accessing Weinstein Stage Analysis screening results.
 """
 
 from flask import Blueprint, jsonify, request
+import pandas as pd
+from nifty500 import get_stock_by_symbol
 from services.weinstein_screening import (
+    get_weekly_history_for_symbol,
     get_weinstein_scores_for_latest_week,
     run_weinstein_screening
 )
@@ -72,17 +75,8 @@ def get_weinstein_score_for_symbol(symbol):
         
         logger.info(f"Fetching Weinstein details for {symbol}")
         
-        # Run screening to get full processed data
-        shortlist, processed_df = run_weinstein_screening(liquidity_threshold)
-        
-        if processed_df.empty:
-            return jsonify({
-                'success': False,
-                'error': 'No data available'
-            }), 404
-        
-        # Filter for the requested symbol
-        symbol_data = processed_df[processed_df['symbol'] == symbol].copy()
+        # Compute the weekly history of just this symbol rather than screening every stock
+        symbol_data = get_weekly_history_for_symbol(symbol, liquidity_threshold)
         
         if symbol_data.empty:
             return jsonify({
@@ -90,8 +84,8 @@ def get_weinstein_score_for_symbol(symbol):
                 'error': f'No data found for symbol {symbol}'
             }), 404
         
-        # Sort by timestamp descending and limit to requested weeks
-        symbol_data = symbol_data.sort_values('timestamp', ascending=False).head(weeks)
+        # History is oldest first; take the requested weeks, newest first
+        symbol_data = symbol_data.iloc[::-1].head(weeks)
         
         # Convert to list of dicts
         weekly_data = []
@@ -113,12 +107,7 @@ def get_weinstein_score_for_symbol(symbol):
                 'rs_slope': round(float(row['rs_slope']), 6) if pd.notna(row['rs_slope']) else None,
                 'rs_52w_high': round(float(row['rs_52w_high']), 4) if pd.notna(row['rs_52w_high']) else None,
                 'conditions': {
-                    'liquidity': bool(row['cond_liquidity']),
                     'stage2': bool(row['cond_stage2']),
-                    'breakout': bool(row['cond_breakout']),
-                    'volume_confirm': bool(row['cond_volume_confirm']),
-                    'rs_uptrend': bool(row['cond_rs_uptrend']),
-                    'strong_rs': bool(row['cond_strong_rs']),
                     'low_resistance': bool(row['cond_low_resistance']),
                     'not_overextended': bool(row['cond_not_overextended']),
                     'all_passed': bool(row['cond_all_passed'])
@@ -129,10 +118,11 @@ def get_weinstein_score_for_symbol(symbol):
         weeks_passed = symbol_data['cond_all_passed'].sum()
         
         # Get stock info
+        stock = get_stock_by_symbol(symbol) or {}
         stock_info = {
             'symbol': symbol,
-            'name': symbol_data.iloc[0]['name'],
-            'sector': symbol_data.iloc[0]['sector']
+            'name': stock.get('name', symbol),
+            'sector': stock.get('sector', 'N/A')
         }
         
         return jsonify({
@@ -158,22 +148,25 @@ def get_weinstein_shortlist():
     
     Query Parameters:
         liquidity_threshold (int): Minimum 20-week avg trading value (default: 1000000)
+        skip_illiquid (bool): Leave out stocks at or below liquidity_threshold (default: false)
     
     Returns:
         JSON array of symbols that passed all filters
     """
     try:
         liquidity_threshold = request.args.get('liquidity_threshold', type=int, default=1000000)
+        skip_illiquid = request.args.get('skip_illiquid', 'false').lower() in ('1', 'true', 'yes')
         
         logger.info(f"Generating Weinstein shortlist with liquidity threshold: ₹{liquidity_threshold:,}")
         
         # Run screening
-        shortlist, _ = run_weinstein_screening(liquidity_threshold)
+        shortlist, _ = run_weinstein_screening(liquidity_threshold, skip_illiquid=skip_illiquid)
         
         return jsonify({
             'success': True,
             'count': len(shortlist),
             'liquidity_threshold': liquidity_threshold,
+            'skip_illiquid': skip_illiquid,
             'shortlist': shortlist
         }), 200
         
@@ -183,7 +176,3 @@ def get_weinstein_shortlist():
             'success': False,
             'error': str(e)
         }), 500
-
-
-# Import pandas for notna checks
-import pandas as pd
@@ -0,0 +1,247 @@
+"""
+Weinstein Indicator Kernels
+
+Numeric loops behind the weekly Weinstein indicators. Each kernel works on plain
+NumPy arrays and is compiled with Numba when it is installed; without Numba a
+vectorised equivalent is used instead: Bottleneck's moving-window functions when
+available, otherwise NumPy's sliding_window_view. RSI has no vectorised form and
+falls back to the plain Python loop.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import bottleneck as bn
+    BOTTLENECK_AVAILABLE = True
+except ImportError:
+    BOTTLENECK_AVAILABLE = False
+
+
+def _rolling_window_stats_loop(high, close, volume):
+    """
+    Fused single pass over a stock's weekly arrays computing the 52-week high,
+    30-week MA of close, 10-week average volume and 20-week average trading value.
+    The high uses a monotonic deque and the averages running sums, so every week
+    costs O(1) regardless of window length.
+    """
+    n = len(close)
+    high_52w = np.full(n, np.nan)
+    ma30 = np.full(n, np.nan)
+    avg_vol_10 = np.full(n, np.nan)
+    avg_trading_value_20 = np.full(n, np.nan)
+    
+    # Indices of candidate maxima with decreasing highs; the head is the window max
+    candidates = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    sum_close = 0.0
+    sum_volume = 0.0
+    sum_trading_value = 0.0
+    
+    for i in range(n):
+        while tail > head and high[candidates[tail - 1]] <= high[i]:
+            tail -= 1
+        candidates[tail] = i
+        tail += 1
+        if candidates[head] <= i - 52:
+            head += 1
+        if i >= 51:
+            high_52w[i] = high[candidates[head]]
+        
+        sum_close += close[i]
+        if i >= 30:
+            sum_close -= close[i - 30]
+        if i >= 29:
+            ma30[i] = sum_close / 30
+        
+        sum_volume += volume[i]
+        if i >= 10:
+            sum_volume -= volume[i - 10]
+        if i >= 9:
+            avg_vol_10[i] = sum_volume / 10
+        
+        sum_trading_value += close[i] * volume[i]
+        if i >= 20:
+            sum_trading_value -= close[i - 20] * volume[i - 20]
+        if i >= 19:
+            avg_trading_value_20[i] = sum_trading_value / 20
+    
+    return high_52w, ma30, avg_vol_10, avg_trading_value_20
+
+
+def _rolling_max_loop(values, window):
+    """
+    Trailing rolling maximum with a monotonic deque, O(1) per element.
+    NaN until a full window is available or while a NaN is inside the window.
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    candidates = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    last_nan = -1
+    
+    for i in range(n):
+        if np.isnan(values[i]):
+            last_nan = i
+        else:
+            while tail > head and values[candidates[tail - 1]] <= values[i]:
+                tail -= 1
+            candidates[tail] = i
+            tail += 1
+        while tail > head and candidates[head] <= i - window:
+            head += 1
+        if i >= window - 1 and last_nan <= i - window:
+            out[i] = values[candidates[head]]
+    
+    return out
+
+
+def _sliding_window_reduce(values, window, reducer):
+    """
+    Apply reducer over every full trailing window of values, NaN-padded at the front
+    to match pandas rolling(window, min_periods=window).
+    """
+    out = np.full(len(values), np.nan)
+    
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=-1)
+    
+    return out
+
+
+def _rolling_max_numpy(values, window):
+    """
+    NumPy fallback for _rolling_max_loop.
+    """
+    if BOTTLENECK_AVAILABLE and len(values) >= window:
+        return bn.move_max(values, window, min_count=window)
+    return _sliding_window_reduce(values, window, np.max)
+
+
+def rolling_mean(values, window):
+    """
+    Trailing rolling mean; NaN until a full window is available.
+    """
+    if BOTTLENECK_AVAILABLE and len(values) >= window:
+        return bn.move_mean(values, window, min_count=window)
+    return _sliding_window_reduce(values, window, np.mean)
+
+
+def _rolling_window_stats_numpy(high, close, volume):
+    """
+    NumPy fallback for _rolling_window_stats_loop.
+    """
+    return (
+        _rolling_max_numpy(high, 52),
+        rolling_mean(close, 30),
+        rolling_mean(volume, 10),
+        rolling_mean(close * volume, 20)
+    )
+
+
+def _rsi_loop(close, period=14):
+    """
+    RSI with Wilder's smoothing in a single pass, matching TA-Lib: the averages are
+    seeded with the simple mean of the first `period` changes, then smoothed as
+    avg = (avg * (period - 1) + value) / period.
+    """
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    
+    if n <= period:
+        return rsi
+    
+    # Split the changes into gains and losses up front with branch-free maxima
+    change = np.diff(close)
+    gains = np.maximum(change, 0.0)
+    losses = np.maximum(-change, 0.0)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    
+    for i in range(1, n):
+        gain = gains[i - 1]
+        loss = losses[i - 1]
+        
+        if i <= period:
+            avg_gain += gain / period
+            avg_loss += loss / period
+            if i < period:
+                continue
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        
+        if avg_loss > 0:
+            rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            rsi[i] = 100.0
+    
+    return rsi
+
+
+def _macd_loop(close):
+    """
+    MACD line, signal and histogram from the 12/26/9 EMAs in a single pass.
+    Same recurrence as ewm(span=..., adjust=False): each EMA is seeded with the first value.
+    """
+    n = len(close)
+    macd = np.empty(n)
+    signal = np.empty(n)
+    histogram = np.empty(n)
+    
+    if n == 0:
+        return macd, signal, histogram
+    
+    alpha12 = 2.0 / 13.0
+    alpha26 = 2.0 / 27.0
+    alpha9 = 2.0 / 10.0
+    ema12 = close[0]
+    ema26 = close[0]
+    ema9 = 0.0
+    
+    for i in range(n):
+        ema12 += alpha12 * (close[i] - ema12)
+        ema26 += alpha26 * (close[i] - ema26)
+        line = ema12 - ema26
+        if i == 0:
+            ema9 = line
+        else:
+            ema9 += alpha9 * (line - ema9)
+        macd[i] = line
+        signal[i] = ema9
+        histogram[i] = line - ema9
+    
+    return macd, signal, histogram
+
+
+def _macd_pandas(close):
+    """
+    pandas fallback for _macd_loop.
+    """
+    close_s = pd.Series(close)
+    macd = close_s.ewm(span=12, adjust=False).mean() - close_s.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    
+    return macd.to_numpy(), signal.to_numpy(), (macd - signal).to_numpy()
+
+
+if NUMBA_AVAILABLE:
+    rolling_window_stats = njit(cache=True)(_rolling_window_stats_loop)
+    rolling_max = njit(cache=True)(_rolling_max_loop)
+    rsi = njit(cache=True)(_rsi_loop)
+    macd = njit(cache=True)(_macd_loop)
+else:
+    rolling_window_stats = _rolling_window_stats_numpy
+    rolling_max = _rolling_max_numpy
+    # Only shortlisted stocks need RSI, so the plain loop is fast enough
+    rsi = _rsi_loop
+    macd = _macd_pandas
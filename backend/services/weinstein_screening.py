@@ -10,10 +10,20 @@ Optimized with batch processing for reduced memory usage.
 import pandas as pd
 import numpy as np
 import gc
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import itemgetter
+from sqlalchemy import func, select
+from config import Config
 from extensions import db
 from models import OHLCV
 from nifty500 import get_all_stocks, get_nifty50_stocks
+from services.weinstein_kernels import macd, rolling_max, rolling_window_stats, rsi
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +31,65 @@ logger = logging.getLogger(__name__)
 # Batch size for processing
 BATCH_SIZE = 50
 
+# Worker processes for per-stock indicator computation: the CPUs this process may
+# actually run on (respecting affinity/cpusets), capped by configuration
+MAX_WORKERS = max(1, min(
+    len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1,
+    Config.WEINSTEIN_MAX_WORKERS
+))
+
+# Workers are only used when they can be forked: under spawn/forkserver (the macOS
+# default) every worker would re-import the Flask entry point and build a second app
+POOL_CONTEXT = (
+    multiprocessing.get_context('fork')
+    if multiprocessing.get_context().get_start_method() == 'fork' else None
+)
+
+# Generation-0 GC threshold inside workers; their short-lived frames hold no reference
+# cycles, so frequent automatic collections only cost time
+WORKER_GC_THRESHOLD = 100000
+
+# Bump whenever indicator maths changes so stale cache files are ignored
+INDICATOR_CACHE_VERSION = 3
+
+# Longest look-back of any core indicator (the 52-week high); recomputing a cached
+# frame's tail needs this many earlier weeks as lead-in
+CORE_LOOKBACK_WEEKS = 52
+
+# Indicators added by compute_full_indicators; left as NaN for stocks that fail the filters
+FULL_INDICATOR_COLUMNS = [
+    'rs_slope', 'rs_52w_high', 'rsi', 'rsi_slope',
+    'macd', 'macd_signal', 'macd_histogram'
+]
+
+# Minimum number of trading days (bars with a positive close) a stock needs to be screened
+MIN_TRADING_DAYS = 365
+
+# Filter condition columns added by apply_filters; cond_all_passed is the AND of the rest
+CONDITION_COLUMNS = ['cond_stage2', 'cond_low_resistance', 'cond_not_overextended', 'cond_all_passed']
+
+# Symbols the index may be stored under, in order of preference
+INDEX_SYMBOLS = ['^NSEI', 'NIFTY50', 'NIFTY 50', 'NSEI', '^NSEI.NS', 'NIFTY50.NS']
+
+# Storage dtypes for daily OHLCV. Prices fit comfortably in float32; volume stays
+# int64 because weekly sums exceed the range float32 can represent exactly.
+OHLCV_DTYPES = {
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    'volume': 'int64'
+}
+
+# Daily -> weekly aggregation (week ending on Friday)
+WEEKLY_AGG = {
+    'open': 'first',    # First open of the week
+    'high': 'max',      # Highest high of the week
+    'low': 'min',       # Lowest low of the week
+    'close': 'last',    # Last close of the week
+    'volume': 'sum'     # Sum of all volumes
+}
+
 
 def resample_to_weekly(df):
     """
@@ -41,13 +110,7 @@ def resample_to_weekly(df):
         df = df.set_index('timestamp')
     
     # Resample to weekly (week ending on Friday)
-    weekly = df.resample('W-FRI').agg({
-        'open': 'first',    # First open of the week
-        'high': 'max',      # Highest high of the week
-        'low': 'min',       # Lowest low of the week
-        'close': 'last',    # Last close of the week
-        'volume': 'sum'     # Sum of all volumes
-    }).dropna()
+    weekly = df.resample('W-FRI').agg(WEEKLY_AGG).dropna()
     
     # Reset index to have timestamp as column
     weekly.reset_index(inplace=True)
@@ -55,6 +118,31 @@ def resample_to_weekly(df):
     return weekly
 
 
+def resample_to_weekly_by_symbol(df):
+    """
+    Convert daily OHLCV data for many symbols to weekly OHLCV in one grouped resample.
+    
+    Args:
+        df: DataFrame with columns [symbol, timestamp, open, high, low, close, volume]
+    
+    Returns:
+        DataFrame with weekly OHLCV data and a symbol column
+    """
+    if df.empty:
+        return df
+    
+    # Label each bar with its week-ending Friday (the same bins as resample('W-FRI')) and
+    # aggregate with one hash groupby; only weeks that have bars are produced, so no dropna
+    days = df['timestamp'].dt.normalize()
+    week_end = days + pd.to_timedelta((4 - days.dt.weekday) % 7, unit='D')
+    
+    weekly = df.groupby([df['symbol'], week_end.rename('timestamp')], sort=False).agg(WEEKLY_AGG)
+    
+    weekly.reset_index(inplace=True)
+    
+    return weekly
+
+
 def resample_index_to_weekly(df):
     """
     Convert daily index data to weekly close prices.
@@ -74,59 +162,119 @@ def resample_index_to_weekly(df):
     return weekly
 
 
-def compute_indicators(df, index_df):
+def compute_core_indicators(df, index_close):
     """
-    Compute all required Weinstein indicators on weekly data.
+    Compute the indicators the Weinstein filters and score output depend on.
+    
+    Args:
+        df: Weekly OHLCV DataFrame sorted by timestamp
+        index_close: Weekly index close prices as a Series indexed by timestamp
     """
     if df.empty or len(df) < 52:
         return df
     
-    df = df.sort_values('timestamp').reset_index(drop=True)
+    # Weekly frames come out of resample_to_weekly already ordered; no need to re-sort
+    assert df['timestamp'].is_monotonic_increasing, "weekly data must be sorted by timestamp"
+    
+    # Rolling windows for ma30, high_52w, avg_vol_10 and avg_trading_value_20 in one fused pass
+    high_52w, ma30, avg_vol_10, avg_trading_value_20 = rolling_window_stats(
+        df['high'].to_numpy(dtype=float),
+        df['close'].to_numpy(dtype=float),
+        df['volume'].to_numpy(dtype=float)
+    )
     
     # 1. 30-week moving average of close
-    df['ma30'] = df['close'].rolling(window=30, min_periods=30).mean()
+    df['ma30'] = ma30
     
     # 2. Slope of MA30
     df['ma30_slope'] = df['ma30'].diff()
     
     # 3. 52-week high of price
-    df['high_52w'] = df['high'].rolling(window=52, min_periods=52).max()
+    df['high_52w'] = high_52w
     
     # 4. 10-week average volume
-    df['avg_vol_10'] = df['volume'].rolling(window=10, min_periods=10).mean()
+    df['avg_vol_10'] = avg_vol_10
     
     # 5. Trading value
     df['trading_value'] = df['close'] * df['volume']
     
     # 6. 20-week average trading value
-    df['avg_trading_value_20'] = df['trading_value'].rolling(window=20, min_periods=20).mean()
+    df['avg_trading_value_20'] = avg_trading_value_20
     
     # 7. Relative Strength
-    df = df.merge(index_df[['timestamp', 'close']], on='timestamp', how='left', suffixes=('', '_index'))
-    df.rename(columns={'close_index': 'index_close'}, inplace=True)
+    df['index_close'] = df['timestamp'].map(index_close).to_numpy()
     
     df['rs'] = df['close'] / df['index_close']
+    
+    return df
+
+
+def compute_full_indicators(df):
+    """
+    Compute the secondary indicators (RS trend, RSI, MACD) on top of the core ones.
+    None of them feed the filters, so screening only computes them for shortlisted stocks.
+    """
+    if df.empty or len(df) < 52:
+        return df
+    
     df['rs_slope'] = df['rs'].diff()
-    df['rs_52w_high'] = df['rs'].rolling(window=52, min_periods=52).max()
-    
-    # RSI (14-week)
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=14).mean()
-    rs_rsi = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs_rsi))
+    df['rs_52w_high'] = rolling_max(df['rs'].to_numpy(dtype=float), 52)
+    
+    # RSI (14-week) with Wilder's smoothing, matching TradingView/TA-Lib
+    df['rsi'] = rsi(df['close'].to_numpy(dtype=float))
     df['rsi_slope'] = df['rsi'].diff()
     
-    # MACD
-    ema12 = df['close'].ewm(span=12, adjust=False).mean()
-    ema26 = df['close'].ewm(span=26, adjust=False).mean()
-    df['macd'] = ema12 - ema26
-    df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-    df['macd_histogram'] = df['macd'] - df['macd_signal']
+    # MACD (12/26/9 EMAs fused into one pass)
+    macd_line, macd_signal, macd_histogram = macd(df['close'].to_numpy(dtype=float))
+    df['macd'] = macd_line
+    df['macd_signal'] = macd_signal
+    df['macd_histogram'] = macd_histogram
     
     return df
 
 
+def compute_indicators(df, index_close):
+    """
+    Compute all required Weinstein indicators on weekly data.
+    
+    Args:
+        df: Weekly OHLCV DataFrame sorted by timestamp
+        index_close: Weekly index close prices as a Series indexed by timestamp
+    """
+    df = compute_core_indicators(df, index_close)
+    return compute_full_indicators(df)
+
+
+def extend_core_indicators(df, cached_df, index_close):
+    """
+    Compute core indicators, reusing a previously cached frame for the unchanged weeks.
+    Only weeks from the cached frame's last (possibly partial) week onwards are
+    recomputed; falls back to a full computation if the cached history no longer matches.
+    The tail's rolling averages start from fresh running sums, so they can differ from
+    a full computation in the last few bits; results are identical up to float rounding.
+    """
+    start = len(cached_df) - 1
+    
+    if start < CORE_LOOKBACK_WEEKS or start >= len(df):
+        return compute_core_indicators(df, index_close)
+    
+    # Older weeks must be identical, including the index closes they were computed against
+    price_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    cached_index_close = cached_df['index_close'].to_numpy(dtype=float)[:start]
+    current_index_close = df['timestamp'].iloc[:start].map(index_close).to_numpy(dtype=float)
+    
+    if not (
+        df[price_columns].iloc[:start].equals(cached_df[price_columns].iloc[:start])
+        and np.array_equal(cached_index_close, current_index_close, equal_nan=True)
+    ):
+        return compute_core_indicators(df, index_close)
+    
+    lead_in = start - CORE_LOOKBACK_WEEKS
+    tail = compute_core_indicators(df.iloc[lead_in:].reset_index(drop=True), index_close)
+    
+    return pd.concat([cached_df.iloc[:start], tail.iloc[CORE_LOOKBACK_WEEKS:]], ignore_index=True)
+
+
 def apply_filters(df, liquidity_threshold=None):
     """
     Apply Weinstein filter conditions to weekly data.
@@ -134,35 +282,37 @@ def apply_filters(df, liquidity_threshold=None):
     if df.empty:
         return df
     
-    df['cond_stage2'] = False
-    df['cond_low_resistance'] = False
-    df['cond_not_overextended'] = False
-    df['cond_all_passed'] = False
-    
-    if len(df) < 2:
-        return df
+    # Evaluate every week at once on the raw NumPy columns
+    close = df['close'].to_numpy(dtype=float)
+    ma30 = df['ma30'].to_numpy(dtype=float)
+    ma30_slope = df['ma30_slope'].to_numpy(dtype=float)
+    high_52w = df['high_52w'].to_numpy(dtype=float)
     
-    for i in range(1, len(df)):
-        row = df.iloc[i]
+    with np.errstate(invalid='ignore'):
+        # Comparisons against NaN are False, so these masks also encode "value present"
+        positive_ma30 = ma30 > 0
         
         # 1. Stage-2 condition
-        if pd.notna(row['ma30']) and pd.notna(row['ma30_slope']):
-            df.loc[i, 'cond_stage2'] = (row['close'] > row['ma30']) and (row['ma30_slope'] > 0)
+        cond_stage2 = (close > ma30) & (ma30_slope > 0)
         
         # 2. Low overhead resistance
-        if pd.notna(row['high_52w']) and row['high_52w'] > 0:
-            df.loc[i, 'cond_low_resistance'] = row['close'] >= (0.98 * row['high_52w'])
+        cond_low_resistance = (high_52w > 0) & (close >= 0.98 * high_52w)
         
         # 3. Not overextended
-        if pd.notna(row['ma30']) and row['ma30'] > 0:
-            extension = (row['close'] - row['ma30']) / row['ma30']
-            df.loc[i, 'cond_not_overextended'] = extension <= 0.20
-        
-        df.loc[i, 'cond_all_passed'] = (
-            df.loc[i, 'cond_stage2'] and
-            df.loc[i, 'cond_low_resistance'] and
-            df.loc[i, 'cond_not_overextended']
-        )
+        extension = (close - ma30) / np.where(positive_ma30, ma30, np.nan)
+        cond_not_overextended = (extension <= 0.20) & positive_ma30
+    
+    conditions = np.empty((len(df), len(CONDITION_COLUMNS)), dtype=bool)
+    conditions[:, 0] = cond_stage2
+    conditions[:, 1] = cond_low_resistance
+    conditions[:, 2] = cond_not_overextended
+    
+    # The first week has no history to judge against
+    conditions[0, :3] = False
+    conditions[:, 3] = conditions[:, :3].all(axis=1)
+    
+    # One assignment adds all condition columns as a single block
+    df[CONDITION_COLUMNS] = conditions
     
     return df
 
@@ -172,155 +322,434 @@ def get_or_create_index_data():
     Get NIFTY 50 index data from database or create synthetic index.
     Optimized to limit data fetched.
     """
-    index_symbols = ['^NSEI', 'NIFTY50', 'NIFTY 50', 'NSEI', '^NSEI.NS', 'NIFTY50.NS']
+    # Probe every candidate symbol in one round trip, then take the first one present
+    query = select(OHLCV.symbol, OHLCV.timestamp, OHLCV.close).where(
+        OHLCV.symbol.in_(INDEX_SYMBOLS)
+    ).order_by(OHLCV.symbol, OHLCV.timestamp)
+    
+    with db.engine.connect() as connection:
+        candidates_df = pd.read_sql(query, connection, parse_dates=['timestamp'])
     
-    for symbol in index_symbols:
-        index_records = OHLCV.query.filter_by(symbol=symbol).order_by(OHLCV.timestamp.asc()).all()
-        if index_records:
-            logger.info(f"Using index data from symbol: {symbol}")
-            df = pd.DataFrame([{
-                'timestamp': r.timestamp,
-                'close': r.close
-            } for r in index_records])
-            return df
+    if not candidates_df.empty:
+        found = set(candidates_df['symbol'].unique())
+        symbol = next(symbol for symbol in INDEX_SYMBOLS if symbol in found)
+        logger.info(f"Using index data from symbol: {symbol}")
+        df = candidates_df.loc[candidates_df['symbol'] == symbol, ['timestamp', 'close']]
+        return df.reset_index(drop=True)
     
     logger.warning("No index data found. Creating synthetic index from available stocks.")
     
     # Get first 10 available symbols for synthetic index
     available_symbols = db.session.query(OHLCV.symbol).distinct().limit(10).all()
-    all_data = []
-    
-    for (symbol,) in available_symbols:
-        records = OHLCV.query.filter_by(symbol=symbol).order_by(OHLCV.timestamp.asc()).all()
-        if records:
-            df = pd.DataFrame([{
-                'timestamp': r.timestamp,
-                'symbol': r.symbol,
-                'close': r.close
-            } for r in records])
-            all_data.append(df)
-    
-    if not all_data:
+    
+    # Fetch all of their closes in one round trip
+    query = select(OHLCV.symbol, OHLCV.timestamp, OHLCV.close).where(
+        OHLCV.symbol.in_([symbol for (symbol,) in available_symbols])
+    ).order_by(OHLCV.symbol, OHLCV.timestamp)
+    
+    with db.engine.connect() as connection:
+        closes_df = pd.read_sql(query, connection, parse_dates=['timestamp'])
+    
+    if closes_df.empty:
         logger.error("No data available to create synthetic index")
         return pd.DataFrame(columns=['timestamp', 'close'])
     
-    combined = pd.concat(all_data, ignore_index=True)
-    synthetic_index = combined.groupby('timestamp')['close'].mean().reset_index()
+    # The fetched frame is already flat, so average across stocks in one groupby
+    synthetic_index = closes_df.groupby('timestamp', sort=True)['close'].mean().reset_index()
     
-    logger.info(f"Created synthetic index from {len(all_data)} stocks")
+    logger.info(f"Created synthetic index from {closes_df['symbol'].nunique()} stocks")
     
     return synthetic_index
 
 
-def process_stock_batch(stocks, index_weekly, liquidity_threshold=None):
+@lru_cache(maxsize=1)
+def _load_index_close(data_version):
     """
-    Process a batch of stocks and return their processed DataFrames.
-    Includes memory cleanup after processing.
+    Build the weekly index close series, memoised per data_version.
+    Returns (latest daily index timestamp, weekly closes indexed by timestamp),
+    or (None, None) when there is no data to build an index from.
     """
-    batch_results = []
+    index_daily = get_or_create_index_data()
     
-    for stock in stocks:
-        symbol = stock['symbol']
+    if index_daily.empty:
+        return None, None
+    
+    # get_or_create_index_data already returns datetime64 timestamps
+    index_timestamp = index_daily['timestamp'].max()
+    index_weekly = resample_index_to_weekly(index_daily)
+    
+    # Looked up by timestamp for every stock, so index it once up front
+    return index_timestamp, index_weekly.set_index('timestamp')['close']
+
+
+def get_index_close():
+    """
+    Get the weekly index closes, rebuilding them only when new data has landed.
+    The cache key is the latest index bar, or the latest bar of any symbol when
+    the index has to be synthesised from stocks.
+    """
+    data_version = db.session.query(func.max(OHLCV.timestamp)).filter(
+        OHLCV.symbol.in_(INDEX_SYMBOLS)
+    ).scalar()
+    
+    if data_version is None:
+        data_version = ('synthetic', db.session.query(func.max(OHLCV.timestamp)).scalar())
+    
+    return _load_index_close(data_version)
+
+
+def get_indicator_cache_path(symbol, last_timestamp, index_timestamp):
+    """
+    Path of the cached indicator frame for a symbol, keyed on the latest daily
+    bar of both the stock and the index. Returns None when caching is disabled.
+    """
+    if not Config.WEINSTEIN_CACHE_DIR:
+        return None
+    
+    filename = (
+        f"{symbol.replace(os.sep, '_')}_{pd.Timestamp(last_timestamp).value}_"
+        f"{pd.Timestamp(index_timestamp).value}_v{INDICATOR_CACHE_VERSION}.parquet"
+    )
+    return os.path.join(Config.WEINSTEIN_CACHE_DIR, filename)
+
+
+def load_cached_indicators(cache_path):
+    """
+    Read a cached indicator frame, or return None if it is missing or unreadable.
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    
+    try:
+        return pd.read_parquet(cache_path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable indicator cache {cache_path}: {str(e)}")
+        return None
+
+
+def load_previous_indicators(cache_path):
+    """
+    Read the indicator frame cached for the same symbol under an older key (an earlier
+    latest bar), or return None if there is none.
+    """
+    if not cache_path:
+        return None
+    
+    cache_dir, filename = os.path.split(cache_path)
+    prefix = filename.rsplit('_', 3)[0]
+    suffix = f"_v{INDICATOR_CACHE_VERSION}.parquet"
+    
+    try:
+        previous = [
+            existing for existing in os.listdir(cache_dir)
+            if existing != filename and existing.endswith(suffix) and existing.rsplit('_', 3)[0] == prefix
+        ]
+    except OSError:
+        return None
+    
+    if not previous:
+        return None
+    
+    return load_cached_indicators(os.path.join(cache_dir, max(previous)))
+
+
+def store_cached_indicators(weekly_df, cache_path):
+    """
+    Write an indicator frame to the cache and drop older entries for the same symbol.
+    """
+    cache_dir, filename = os.path.split(cache_path)
+    prefix = filename.rsplit('_', 3)[0]
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        # Only finished entries; another process's in-flight .tmp file must survive
+        for existing in os.listdir(cache_dir):
+            if existing != filename and existing.endswith('.parquet') and existing.rsplit('_', 3)[0] == prefix:
+                os.remove(os.path.join(cache_dir, existing))
         
+        # Write to a temp file first so concurrent readers never see a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        weekly_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not write indicator cache {cache_path}: {str(e)}")
+
+
+def summarize_latest_week(weekly_df, stock, liquidity_threshold=None):
+    """
+    Apply filters to a stock's weekly indicators and return its latest week as a plain record.
+    """
+    symbol = stock['symbol']
+    
+    weekly_df = apply_filters(weekly_df, liquidity_threshold)
+    
+    # Only keep the last row; a dict is cheaper to pass back from workers than a DataFrame
+    if weekly_df['cond_all_passed'].iloc[-1]:
+        latest_week = compute_full_indicators(weekly_df).iloc[-1].to_dict()
+    else:
+        latest_week = weekly_df.iloc[-1].to_dict()
+        latest_week.update(dict.fromkeys(FULL_INDICATOR_COLUMNS, np.nan))
+    
+    # Previous week's close, so the week-over-week change can be computed for all stocks at once
+    latest_week['prev_close'] = weekly_df['close'].iloc[-2]
+    latest_week['symbol'] = symbol
+    latest_week['name'] = stock.get('name', symbol)
+    latest_week['sector'] = stock.get('sector', 'N/A')
+    
+    return latest_week
+
+
+def process_one(weekly_df, stock, index_close, liquidity_threshold=None, cache_path=None):
+    """
+    Compute core indicators and apply filters for a single stock's weekly data.
+    Runs inside a worker process, so it must not touch the database.
+    Returns the latest week as a record, or None if there is not enough data.
+    """
+    if len(weekly_df) < 52:
+        return None
+    
+    # A run after a new bar only has to recompute the latest weeks of a cached frame
+    previous_df = load_previous_indicators(cache_path)
+    if previous_df is not None:
+        weekly_df = extend_core_indicators(weekly_df, previous_df, index_close)
+    else:
+        weekly_df = compute_core_indicators(weekly_df, index_close)
+    
+    if cache_path:
+        store_cached_indicators(weekly_df, cache_path)
+    
+    return summarize_latest_week(weekly_df, stock, liquidity_threshold)
+
+
+# Weekly index closes installed once per worker process by init_worker
+_worker_index_close = None
+
+
+def init_worker(index_close=None):
+    """
+    Initialise a screening worker process.
+    The index series is sent once here instead of being pickled with every chunk.
+    """
+    global _worker_index_close
+    
+    gc.set_threshold(WORKER_GC_THRESHOLD, 10, 10)
+    _worker_index_close = index_close
+
+
+def process_chunk(chunk, index_close=None, liquidity_threshold=None):
+    """
+    Run process_one over a list of (weekly_df, stock, cache_path) tuples in a single worker call.
+    Errors are logged per stock so one bad symbol does not sink the whole chunk.
+    Without index_close, the series installed by init_worker is used.
+    """
+    if index_close is None:
+        index_close = _worker_index_close
+    
+    results = []
+    
+    for weekly_df, stock, cache_path in chunk:
         try:
-            # Get daily OHLCV data - use yield_per for memory efficiency
-            ohlcv_records = OHLCV.query.filter_by(symbol=symbol).order_by(OHLCV.timestamp.asc()).all()
-            
-            if not ohlcv_records or len(ohlcv_records) < 365:
-                continue
-            
-            daily_df = pd.DataFrame([{
-                'timestamp': r.timestamp,
-                'open': r.open,
-                'high': r.high,
-                'low': r.low,
-                'close': r.close,
-                'volume': r.volume
-            } for r in ohlcv_records])
-            
-            # Clean up records immediately
-            del ohlcv_records
-            
-            daily_df = daily_df[daily_df['close'] > 0]
-            
-            if len(daily_df) < 365:
-                del daily_df
-                continue
-            
-            daily_df['timestamp'] = pd.to_datetime(daily_df['timestamp'])
-            weekly_df = resample_to_weekly(daily_df)
-            
-            # Clean up daily data
-            del daily_df
+            latest_week = process_one(weekly_df, stock, index_close, liquidity_threshold, cache_path)
+            if latest_week is not None:
+                results.append(latest_week)
+        except Exception as e:
+            logger.error(f"Error processing {stock['symbol']}: {str(e)}")
+    
+    return results
+
+
+def latest_avg_trading_value(weekly_df):
+    """
+    20-week average trading value of each symbol's latest week, indexed by symbol.
+    Same value as avg_trading_value_20 but without computing the full history.
+    """
+    trading_value = pd.Series(
+        weekly_df['close'].to_numpy(dtype=float) * weekly_df['volume'].to_numpy(dtype=float),
+        index=weekly_df.index
+    )
+    latest = trading_value.groupby(weekly_df['symbol'], sort=False).tail(20)
+    
+    return latest.groupby(weekly_df['symbol'].loc[latest.index], sort=False).mean()
+
+
+def load_daily_bars(symbols):
+    """
+    Fetch the daily bars of the given symbols in one query, ordered by symbol and
+    timestamp. Closed days (close <= 0) are dropped in the query.
+    """
+    query = select(
+        OHLCV.symbol, OHLCV.timestamp, OHLCV.open, OHLCV.high,
+        OHLCV.low, OHLCV.close, OHLCV.volume
+    ).where(OHLCV.symbol.in_(symbols), OHLCV.close > 0).order_by(OHLCV.symbol, OHLCV.timestamp)
+    
+    with db.engine.connect() as connection:
+        # Cast while the frame is built rather than copying a float64 frame afterwards
+        return pd.read_sql(query, connection, parse_dates=['timestamp'], dtype=OHLCV_DTYPES)
+
+
+def get_eligible_symbols():
+    """
+    Latest trading day of every symbol with at least MIN_TRADING_DAYS trading days,
+    as {symbol: timestamp}. Counted in the database so stocks with too short a history
+    are never fetched, and the timestamps key the indicator cache without loading any bars.
+    """
+    query = db.session.query(OHLCV.symbol, func.max(OHLCV.timestamp)).filter(OHLCV.close > 0).group_by(
+        OHLCV.symbol
+    ).having(func.count(OHLCV.id) >= MIN_TRADING_DAYS)
+    
+    return {symbol: last_timestamp for symbol, last_timestamp in query}
+
+
+def process_stock_batch(stocks, index_close, liquidity_threshold=None, executor=None, index_timestamp=None,
+                        skip_illiquid=False, latest_timestamps=None):
+    """
+    Process a batch of stocks and return the latest-week record of each.
+    Stocks whose indicators are cached for their latest bar (from latest_timestamps)
+    are finished inline without fetching their data; the rest is fetched in one query,
+    split into one chunk per worker and farmed out to the executor when one is given,
+    otherwise it runs inline. The executor's workers must have been initialised with
+    init_worker(index_close). Stocks are expected to have passed get_eligible_symbols.
+    With skip_illiquid, stocks whose latest 20-week average trading value does not
+    exceed liquidity_threshold are dropped before any indicators are computed.
+    """
+    skip_illiquid = skip_illiquid and liquidity_threshold is not None
+    
+    # Stocks whose latest bar has not moved since the last run reuse cached indicators
+    batch_results = {}
+    cache_paths = {}
+    if index_timestamp is not None and latest_timestamps is not None:
+        for stock in stocks:
+            symbol = stock['symbol']
+            cache_path = get_indicator_cache_path(symbol, latest_timestamps[symbol], index_timestamp)
+            cached_df = load_cached_indicators(cache_path)
             
-            if len(weekly_df) < 52:
-                del weekly_df
+            if cached_df is None:
+                cache_paths[symbol] = cache_path
                 continue
             
-            weekly_df = compute_indicators(weekly_df, index_weekly)
-            weekly_df = apply_filters(weekly_df, liquidity_threshold)
-            
-            weekly_df['symbol'] = symbol
-            weekly_df['name'] = stock.get('name', symbol)
-            weekly_df['sector'] = stock.get('sector', 'N/A')
-            
-            # Only keep the last row for memory efficiency in final results
-            latest_week_df = weekly_df.tail(1).copy()
-            batch_results.append(latest_week_df)
-            
-            del weekly_df
-            
-        except Exception as e:
-            logger.error(f"Error processing {symbol}: {str(e)}")
-            continue
-    
-    return batch_results
+            # A bad cache entry is logged like any other stock error and recomputed
+            try:
+                if not skip_illiquid or cached_df['avg_trading_value_20'].iloc[-1] > liquidity_threshold:
+                    batch_results[symbol] = summarize_latest_week(cached_df, stock, liquidity_threshold)
+            except Exception as e:
+                logger.error(f"Error processing {symbol}: {str(e)}")
+                cache_paths[symbol] = cache_path
+        
+        # Only symbols without a usable cache entry still need their bars
+        symbols = list(cache_paths)
+    else:
+        symbols = [stock['symbol'] for stock in stocks]
+    
+    if not symbols:
+        return [batch_results[stock['symbol']] for stock in stocks if stock['symbol'] in batch_results]
+    
+    # A failed load (e.g. the database locked by a running download) only costs this
+    # batch's uncached stocks; cache hits are still returned and the run continues
+    try:
+        # One round trip for the whole batch instead of one ORM query per stock
+        batch_df = load_daily_bars(symbols)
+        
+        # Resample every remaining symbol in the batch in one grouped call
+        weekly_all = resample_to_weekly_by_symbol(batch_df)
+        del batch_df
+        
+        # Liquidity pushdown: only the latest week's average is needed to reject a stock
+        if skip_illiquid and not weekly_all.empty:
+            avg_trading_value = latest_avg_trading_value(weekly_all)
+            weekly_all = weekly_all[weekly_all['symbol'].isin(avg_trading_value.index[avg_trading_value > liquidity_threshold])]
+        
+        weekly_by_symbol = {
+            symbol: weekly_df.drop(columns='symbol').reset_index(drop=True)
+            for symbol, weekly_df in weekly_all.groupby('symbol', sort=False)
+        }
+        del weekly_all
+    except Exception as e:
+        logger.error(f"Error loading batch {symbols[0]}..{symbols[-1]}: {str(e)}")
+        weekly_by_symbol = {}
+    
+    payloads = []
+    for stock in stocks:
+        weekly_df = weekly_by_symbol.pop(stock['symbol'], None)
+        if weekly_df is not None:
+            payloads.append((weekly_df, stock, cache_paths.get(stock['symbol'])))
+    
+    if executor is None:
+        computed = process_chunk(payloads, index_close, liquidity_threshold)
+    else:
+        # A few large chunks amortise the IPC round trip; index_close is already in the workers
+        chunk_size = max(1, -(-len(payloads) // MAX_WORKERS))
+        futures = [
+            executor.submit(process_chunk, payloads[i:i + chunk_size], None, liquidity_threshold)
+            for i in range(0, len(payloads), chunk_size)
+        ]
+        # Take chunks in completion order; results are put back in input order below
+        computed = [latest_week for future in as_completed(futures) for latest_week in future.result()]
+    
+    for latest_week in computed:
+        batch_results[latest_week['symbol']] = latest_week
+    
+    # Keep the input order so results are deterministic
+    return [batch_results[stock['symbol']] for stock in stocks if stock['symbol'] in batch_results]
 
 
-def run_weinstein_screening(liquidity_threshold=1000000):
+def run_weinstein_screening(liquidity_threshold=1000000, skip_illiquid=False):
     """
     Main function to run Weinstein screening on all Nifty 500 stocks.
     Optimized with batch processing for reduced memory usage.
+    Pass skip_illiquid=True to leave stocks below liquidity_threshold out of the results.
     """
     logger.info("Starting Weinstein screening process...")
     
-    all_stocks = get_all_stocks()
+    # Drop stocks with less than a year of trading history before fetching anything
+    latest_timestamps = get_eligible_symbols()
+    all_stocks = [stock for stock in get_all_stocks() if stock['symbol'] in latest_timestamps]
     
-    index_daily = get_or_create_index_data()
+    index_timestamp, index_close = get_index_close()
     
-    if index_daily.empty:
+    if index_close is None:
         logger.error("No index data available. Cannot proceed with screening.")
         return [], pd.DataFrame()
     
-    index_daily['timestamp'] = pd.to_datetime(index_daily['timestamp'])
-    index_weekly = resample_index_to_weekly(index_daily)
-    
-    del index_daily
-    gc.collect()
-    
     logger.info(f"Processing {len(all_stocks)} stocks in batches of {BATCH_SIZE}...")
     
-    all_latest_data = []
+    # Latest-week values are accumulated column by column; no per-stock DataFrame is built
+    latest_columns = defaultdict(list)
     total_stocks = len(all_stocks)
     
-    # Process in batches
-    for batch_start in range(0, total_stocks, BATCH_SIZE):
-        batch_end = min(batch_start + BATCH_SIZE, total_stocks)
-        batch_stocks = all_stocks[batch_start:batch_end]
-        
-        logger.info(f"Processing batch {batch_start + 1}-{batch_end} of {total_stocks}...")
-        
-        batch_results = process_stock_batch(batch_stocks, index_weekly, liquidity_threshold)
-        all_latest_data.extend(batch_results)
-        
-        # Force garbage collection after each batch
-        gc.collect()
+    # Process in batches, computing indicators in parallel across forked worker processes;
+    # with a single worker (or no fork) the pool would only add process and pickling cost
+    if MAX_WORKERS > 1 and POOL_CONTEXT is not None:
+        pool = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS, mp_context=POOL_CONTEXT,
+            initializer=init_worker, initargs=(index_close,)
+        )
+    else:
+        pool = nullcontext()
     
-    if not all_latest_data:
+    with pool as executor:
+        for batch_start in range(0, total_stocks, BATCH_SIZE):
+            batch_end = min(batch_start + BATCH_SIZE, total_stocks)
+            batch_stocks = all_stocks[batch_start:batch_end]
+            
+            logger.info(f"Processing batch {batch_start + 1}-{batch_end} of {total_stocks}...")
+            
+            batch_results = process_stock_batch(
+                batch_stocks, index_close, liquidity_threshold, executor, index_timestamp, skip_illiquid,
+                latest_timestamps
+            )
+            for latest_week in batch_results:
+                for column, value in latest_week.items():
+                    latest_columns[column].append(value)
+            
+            # Force garbage collection after each batch
+            gc.collect()
+    
+    if not latest_columns:
         logger.warning("No stocks were successfully processed")
         return [], pd.DataFrame()
     
-    processed_df = pd.concat(all_latest_data, ignore_index=True)
+    processed_df = pd.DataFrame(latest_columns)
     
     # Generate shortlist
     shortlist = processed_df[processed_df['cond_all_passed'] == True]['symbol'].unique().tolist()
@@ -330,61 +759,112 @@ def run_weinstein_screening(liquidity_threshold=1000000):
     return shortlist, processed_df
 
 
-def get_weinstein_scores_for_latest_week(liquidity_threshold=None):
+def get_weekly_history_for_symbol(symbol, liquidity_threshold=None):
     """
-    Get Weinstein scores and details for all stocks in the latest week.
+    Weekly indicators and filter results over one stock's whole history, oldest first.
+    Only that stock's bars are loaded; returns an empty DataFrame when there is not
+    enough history or no index data.
     """
-    shortlist, processed_df = run_weinstein_screening(liquidity_threshold)
+    index_timestamp, index_close = get_index_close()
+    
+    if index_close is None:
+        return pd.DataFrame()
+    
+    daily_df = load_daily_bars([symbol])
+    
+    if len(daily_df) < MIN_TRADING_DAYS:
+        return pd.DataFrame()
+    
+    weekly_df = resample_to_weekly_by_symbol(daily_df).drop(columns='symbol')
+    
+    if len(weekly_df) < 52:
+        return pd.DataFrame()
+    
+    weekly_df = compute_indicators(weekly_df, index_close)
     
+    return apply_filters(weekly_df, liquidity_threshold)
+
+
+def _round_or_none(series, decimals):
+    """
+    Round a float column, replacing missing values with None for JSON output.
+    """
+    return series.astype(float).round(decimals).astype(object).where(series.notna(), None)
+
+
+def score_weekly_records(processed_df):
+    """
+    Score, stage and format screened rows in one columnar pass.
+    Works on any number of rows per symbol; returns records sorted by score.
+    """
     if processed_df.empty:
         return []
     
-    latest_data = processed_df.copy()
-    
     # Calculate score
-    latest_data['score'] = (
-        (latest_data['cond_stage2'].astype(int) * 33.33) +
-        (latest_data['cond_low_resistance'].astype(int) * 33.33) +
-        (latest_data['cond_not_overextended'].astype(int) * 33.34)
+    score = (
+        (processed_df['cond_stage2'].astype(int) * 33.33) +
+        (processed_df['cond_low_resistance'].astype(int) * 33.33) +
+        (processed_df['cond_not_overextended'].astype(int) * 33.34)
     ).round(0).astype(int)
     
-    def determine_stage(row):
-        if row['cond_all_passed']:
-            return 'Stage 2'
-        elif row['cond_stage2']:
-            return 'Stage 2'
-        elif pd.notna(row['ma30']) and row['close'] < row['ma30'] and pd.notna(row['ma30_slope']) and row['ma30_slope'] < -1.0:
-            return 'Stage 4'
-        elif pd.notna(row['ma30']) and row['close'] < row['ma30']:
-            return 'Stage 1'
-        else:
-            return 'Stage 3'
-    
-    latest_data['stage'] = latest_data.apply(determine_stage, axis=1)
-    latest_data['change'] = 0.0
-    
-    results = []
-    for _, row in latest_data.iterrows():
-        results.append({
-            'symbol': row['symbol'],
-            'name': row['name'],
-            'sector': row['sector'],
-            'score': int(row['score']),
-            'stage': row['stage'],
-            'price': round(float(row['close']), 2),
-            'change': round(float(row['change']), 2),
-            'volume': int(row['volume']),
-            'ma30': round(float(row['ma30']), 2) if pd.notna(row['ma30']) else None,
-            'ma150': None,
-            'ma200': None,
-            'rs': round(float(row['rs']), 4) if pd.notna(row['rs']) else None,
-            'conditions_passed': {
-                'stage2': bool(row['cond_stage2']),
-                'low_resistance': bool(row['cond_low_resistance']),
-                'not_overextended': bool(row['cond_not_overextended'])
-            }
-        })
-    
-    results.sort(key=lambda x: x['score'], reverse=True)
+    # Stage labels from whole-column masks; the first matching condition wins
+    close = processed_df['close'].to_numpy(dtype=float)
+    ma30 = processed_df['ma30'].to_numpy(dtype=float)
+    ma30_slope = processed_df['ma30_slope'].to_numpy(dtype=float)
+    below_ma30 = ~np.isnan(ma30) & (close < ma30)
+    
+    # Week-over-week change in percent from each stock's previous weekly close
+    prev_close = processed_df['prev_close'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(prev_close > 0, (close / prev_close - 1) * 100, 0.0)
+    
+    stage = np.select(
+        [
+            processed_df['cond_all_passed'].to_numpy(dtype=bool),
+            processed_df['cond_stage2'].to_numpy(dtype=bool),
+            below_ma30 & ~np.isnan(ma30_slope) & (ma30_slope < -1.0),
+            below_ma30
+        ],
+        ['Stage 2', 'Stage 2', 'Stage 4', 'Stage 1'],
+        default='Stage 3'
+    )
+    
+    # Format all output columns at once as plain Python lists; zipping them into
+    # dicts skips building an output DataFrame and boxing each value in to_dict
+    count = len(processed_df)
+    output = {
+        'symbol': processed_df['symbol'].tolist(),
+        'name': processed_df['name'].tolist(),
+        'sector': processed_df['sector'].tolist(),
+        'score': score.tolist(),
+        'stage': stage.tolist(),
+        'price': processed_df['close'].astype(float).round(2).tolist(),
+        'change': np.round(change, 2).tolist(),
+        'volume': processed_df['volume'].astype(int).tolist(),
+        'ma30': _round_or_none(processed_df['ma30'], 2).tolist(),
+        'ma150': [None] * count,
+        'ma200': [None] * count,
+        'rs': _round_or_none(processed_df['rs'], 4).tolist()
+    }
+    conditions = {
+        'stage2': processed_df['cond_stage2'].astype(bool).tolist(),
+        'low_resistance': processed_df['cond_low_resistance'].astype(bool).tolist(),
+        'not_overextended': processed_df['cond_not_overextended'].astype(bool).tolist()
+    }
+    
+    results = [dict(zip(output, values)) for values in zip(*output.values())]
+    for record, passed in zip(results, zip(*conditions.values())):
+        record['conditions_passed'] = dict(zip(conditions, passed))
+    
+    results.sort(key=itemgetter('score'), reverse=True)
     
     return results
+
+
+def get_weinstein_scores_for_latest_week(liquidity_threshold=None):
+    """
+    Get Weinstein scores and details for all stocks in the latest week.
+    """
+    shortlist, processed_df = run_weinstein_screening(liquidity_threshold)
+    
+    return score_weekly_records(processed_df)